@@ -3,18 +3,22 @@ __version__ = "r2026.01.03-2"
 
 import contextlib
 import logging
-import re
 import sys
 from argparse import ArgumentParser, BooleanOptionalAction
-from asyncio.tasks import FIRST_COMPLETED, Task, as_completed, wait
+from asyncio.locks import Semaphore
+from asyncio.queues import Queue
+from asyncio.taskgroups import TaskGroup
 from enum import Enum
+from functools import lru_cache
+from itertools import cycle
 from pathlib import Path
-from urllib.parse import ParseResult, parse_qs, urlparse
+from urllib.parse import urlparse
 
-from msgspec import UNSET, Struct
+from msgspec import Struct
 from PIL import Image, ImageDraw
 from telethon import TelegramClient
 from telethon.network.connection.tcpabridged import ConnectionTcpAbridged
+from telethon.sessions import StringSession
 from tqdm.contrib import DummyTqdmFile
 from tqdm.contrib.logging import logging_redirect_tqdm
 
@@ -44,20 +48,21 @@ from .src.utils import (
     add_opts_args,
     format_duration,
     parse_proxy,
+    prefetch,
     round_size,
-    unpack_default,
     wrap_async,
 )
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
-    from asyncio import Future, _CoroutineLike
-    from collections.abc import Sequence
+    from asyncio import _CoroutineLike
+    from collections.abc import Iterator, Sequence
     from typing import Any
 
     from telethon.hints import Entity
     from telethon.tl.custom import Message
 
+COMPLETE_BATCH = 16
 TQDM_ERR = DummyTqdmFile(sys.stderr)
 TQDM_OUT = DummyTqdmFile(sys.stdout)
 
@@ -116,11 +121,17 @@ class TGDownloader(ABC):
     _args: Arguments
     _client: TelegramClient
     _client_orig: TelegramClient
+    _completed: list[int]
     _dl_threads: int
+    _done: "Queue[DownloadResult]"
+    _extra_clients: list[TelegramClient]
     _input: InputFile
     _mode: Mode
+    _pool: "Iterator[TelegramClient]"
+    _seen_ids: set[int]
+    _sem: Semaphore
     _sheet: SheetGenerator
-    _tasks: set[Task[DownloadResult]]
+    _taskgroup: TaskGroup
     _wait_time: float | None
     _wrapper: InputMessageWrapper
 
@@ -133,9 +144,12 @@ class TGDownloader(ABC):
         self._client = client
         self._mode = args.mode
         self._wait_time = None
-        self._tasks = set()
+        self._completed = []
+        self._done = Queue()
+        self._extra_clients = []
         self._archive = arc.create(urlparse(self._args.archive))
         self._dl_threads = args.download_threads
+        self._sem = Semaphore(self._dl_threads)
         if args.file:
             self._input = args.file
         if args.create_sheet:
@@ -144,7 +158,7 @@ class TGDownloader(ABC):
             self._wait_time = 0.0
         self._wrapper = InputMessageWrapper(
             client,
-            Path(args.download_path or Path.cwd()),
+            Path(args.download_path or Path.cwd()).absolute(),
             args.categorize,
             args.create_sheet,
             args.overwrite,
@@ -159,20 +173,33 @@ class TGDownloader(ABC):
         if self._args.takeout:
             self._client_orig = self._client
             self._client = await self._client.takeout().__aenter__()
+        else:
+            for _ in range(self._dl_threads // 4):
+                self._extra_clients.append(await self._spawn_client())
+        self._pool = cycle((self._client, *self._extra_clients))
+        self._taskgroup = await TaskGroup().__aenter__()
         return self
 
     async def __aexit__(self, *exc: "Any"):
+        await self._taskgroup.__aexit__(*exc)
         if self._args.takeout:
             await self._client.__aexit__(*exc)
             self._client = self._client_orig
+        for client in self._extra_clients:
+            await client.__aexit__(*exc)
         await self._client.__aexit__(*exc)
-        await self._archive.__aexit__(*exc)
+        try:
+            await self.flush_completed()
+        finally:
+            await self._archive.__aexit__(*exc)
         if self._args.create_sheet:
             self._sheet.__exit__(*exc)
 
     async def run(self):
         logger.debug("current loop %s", self._loop)
         await self._archive.prepare()
+        self._seen_ids = await self._archive.all_ids()
+        logger.debug("archive holds %s known file ids", len(self._seen_ids))
         match self._mode:
             case Mode.Interactive:
                 with tqdm() as prog:
@@ -181,6 +208,7 @@ class TGDownloader(ABC):
                         self._args._imsg_id,
                         prog,
                     )
+                    await self._drain()
             case Mode.File:
                 async with self._input.ensure_write() as f:
                     async for t in self.process_file():
@@ -198,7 +226,7 @@ class TGDownloader(ABC):
                             else:
                                 ids = (message_id - 1, 0)
                             await self.process_ids(entity, [ids], subprog)
-        await self.wait_tasks()
+                        await self._drain()
 
     async def process_file(self):
         async for lnum, line in tqdm(aiter(self._input), "Overall", len(self._input)):
@@ -212,22 +240,20 @@ class TGDownloader(ABC):
                 await self._input.set_status(lnum, "##%s (entity error)")
                 continue
 
-            async for message, reply_id in iter_messages(
-                self._client,
-                entity,
-                ids=msg_id,
-                wait_time=self._wait_time,
+            async for message, reply_id in prefetch(
+                iter_messages(
+                    self._client,
+                    entity,
+                    ids=msg_id,
+                    wait_time=self._wait_time,
+                )
             ):
-                if done := await self.add_task(
-                    self.validate(message, entity, reply_id, lnum=lnum)
-                ):
-                    for t in done:
-                        yield t
-        for t in as_completed(self._tasks):
-            r = await self._handle_or_return(t)
-            if r:
-                yield r
-        self._tasks.clear()
+                await self.add_task(self.validate(message, entity, reply_id, lnum=lnum))
+                while not self._done.empty():
+                    yield self._done.get_nowait()
+        await self._drain()
+        while not self._done.empty():
+            yield self._done.get_nowait()
 
     async def process_ids(
         self,
@@ -236,7 +262,8 @@ class TGDownloader(ABC):
         prog: "tqdm[Any]",
     ):
         entity = await resolve_entity(self._client, raw_entity)
-        logger.debug("processing entity: %s", {raw_entity: str(entity)})
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("processing entity: %s", {raw_entity: str(entity)})
         prog.set_description(str(raw_entity))
         prog.reset(0)
         for start_id, end_id in ids:
@@ -263,19 +290,19 @@ class TGDownloader(ABC):
                     wait_time=self._wait_time,
                     reverse=self._args.reverse_download,
                 )
-            async for message, reply_id in pool:
+            async for message, reply_id in prefetch(pool):
                 if reply_id is None:
                     prog.update(1)
                 await self.add_task(self.validate(message, entity, reply_id))
             prog.refresh()
 
-    async def _handle_or_return(self, t: "Future[DownloadResult]"):
+    async def _handle_or_return(self, t: "_CoroutineLike[DownloadResult]"):
         try:
             return await t
         except FileAlreadyExists as e:
             message, entity, file_id, meta_path = e.args
             try:
-                await self._archive.set_complete(file_id)
+                await self.set_complete(file_id)
             except Exception:
                 pass
             if self._args.always_write_meta:
@@ -301,8 +328,10 @@ class TGDownloader(ABC):
             username,
             reply_id,
         )
+        debug = logger.isEnabledFor(logging.DEBUG)
         if (file := message.file) is None:
-            logger.debug("%s: message does not have any file", message_repr)
+            if debug:
+                logger.debug("%s: message does not have any file", message_repr)
             raise MessageHasNoFile
         fattr = get_file_attr(file)
         target_path, meta_path = self._wrapper.resolve_path(
@@ -315,17 +344,22 @@ class TGDownloader(ABC):
             fattr,
         )
 
-        if not self._wrapper.overwrite and target_path.exists():
-            logger.debug(
-                "%s: target file already exists, skipping download", message_repr
-            )
+        if not self._wrapper.overwrite and self._wrapper.target_exists(target_path):
+            if debug:
+                logger.debug(
+                    "%s: target file already exists, skipping download", message_repr
+                )
             raise FileAlreadyExists(message, entity, fattr.id, meta_path)
-        if (msg := await self._archive.check_id(fattr.id)) is not None:
-            logger.debug(
-                "%s: duplicate file id with message %s, skipping download",
-                message_repr,
-                msg,
-            )
+        if (
+            fattr.id in self._seen_ids
+            and (msg := await self._archive.check_id(fattr.id)) is not None
+        ):
+            if debug:
+                logger.debug(
+                    "%s: duplicate file id with message %s, skipping download",
+                    message_repr,
+                    msg,
+                )
             raise MessageValidationError(message, entity, meta_path)
         wrapped = await self._wrapper.wrap(
             message,
@@ -347,18 +381,20 @@ class TGDownloader(ABC):
                 if not downloaded and msg == str(self):
                     pass
                 elif file_hash == wrapped.file_hash:
-                    logger.debug(
-                        "%s: duplicate file hash with message %s, skipping download",
-                        wrapped,
-                        msg,
-                    )
+                    if debug:
+                        logger.debug(
+                            "%s: duplicate file hash with message %s, skipping download",
+                            wrapped,
+                            msg,
+                        )
                     raise MessageValidationError(message, entity, meta_path)
                 else:
-                    logger.debug(
-                        "%s: duplicate attribute with message %s, skipping download",
-                        wrapped,
-                        msg,
-                    )
+                    if debug:
+                        logger.debug(
+                            "%s: duplicate attribute with message %s, skipping download",
+                            wrapped,
+                            msg,
+                        )
                     raise MessageValidationError(message, entity, meta_path)
             case None:
                 await self._archive.update(
@@ -374,52 +410,90 @@ class TGDownloader(ABC):
                     fattr.duration,
                     fattr.type.arc,
                 )
+        self._seen_ids.add(fattr.id)
         return await self.download_message(wrapped, **ctx)
 
     async def add_task(self, task: "_CoroutineLike[DownloadResult]"):
-        self._tasks.add(self._loop.create_task(task))
-        if len(self._tasks) >= self._dl_threads:
-            done, pending = await wait(self._tasks, return_when=FIRST_COMPLETED)
-            self._tasks.difference_update(done)
-            self._tasks.update(pending)
-            return [r for t in done if (r := await self._handle_or_return(t))]
-
-    async def wait_tasks(self):
-        for t in as_completed(self._tasks):
-            await self._handle_or_return(t)
-        self._tasks.clear()
+        await self._sem.acquire()
+        self._taskgroup.create_task(self._slot(task))
+
+    async def _slot(self, task: "_CoroutineLike[DownloadResult]"):
+        try:
+            if (r := await self._handle_or_return(task)) is not None and r.context:
+                self._done.put_nowait(r)
+        except Exception:
+            logger.exception("unhandled error in download task")
+        finally:
+            self._sem.release()
+
+    async def _drain(self):
+        for _ in range(self._dl_threads):
+            await self._sem.acquire()
+        for _ in range(self._dl_threads):
+            self._sem.release()
+
+    async def _spawn_client(self):
+        if (proxy := self._args.proxy) is not None:
+            proxy = parse_proxy(urlparse(proxy))
+        client = TelegramClient(
+            StringSession(StringSession.save(self._client.session)),
+            self._client.api_id,
+            self._client.api_hash,
+            connection=ConnectionTcpAbridged,
+            use_ipv6=self._args.ipv6,
+            proxy=proxy,  # type: ignore
+            catch_up=False,
+            receive_updates=False,
+        )
+        return await client.__aenter__()
+
+    async def set_complete(self, file_id: int):
+        self._completed.append(file_id)
+        if len(self._completed) >= COMPLETE_BATCH:
+            await self.flush_completed()
+
+    async def flush_completed(self):
+        if ids := self._completed:
+            self._completed = []
+            # buffered rows must land before their downloaded mark
+            await self._archive.flush()
+            await self._archive.set_complete_many(ids)
 
     async def download_message(self, message: MessageWrapped, **ctx: "Any"):
         download_success = False
-        logger.debug("downloading %s as %s", message, message.target_path.name)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("downloading %s as %s", message, message.target_path.name)
         part_file = message.target_path.with_suffix(
             message.target_path.suffix + ".part"
         )
         try:
             fattr = message.file_attr
+            client = next(self._pool)
             with (
                 contextlib.redirect_stderr(TQDM_ERR),  # type: ignore
                 contextlib.redirect_stdout(TQDM_OUT),  # type: ignore
             ):
                 if message.thumbs_only:
-                    await self._client.download_media(
+                    await client.download_media(
                         message.message,  # type: ignore
-                        file=str(part_file.absolute()),
+                        file=str(part_file),
                         thumb=-1,
                     )
                 else:
-                    await self._client.download_media(
+                    await client.download_media(
                         message.message,  # type: ignore
-                        file=str(part_file.absolute()),
+                        file=str(part_file),
                     )
-            part_file.rename(message.target_path)
-            await self._wrapper.write_meta(
-                message.message,
-                message.entity,
+            await wrap_async(
+                _finalize_file,
+                part_file,
+                message.target_path,
                 message.meta_path,
+                self._wrapper.encode_meta(message.message, message.entity),
             )
+            self._wrapper.track_target(message.target_path)
             download_success = True
-            await self._archive.set_complete(fattr.id)
+            await self.set_complete(fattr.id)
             logger.info("%s: file downloaded", message)
             await self.post_download(message)
             return DownloadResult(download_success, message, ctx)
@@ -442,26 +516,31 @@ class TGDownloader(ABC):
                 round_size(fattr.size or 0),
                 format_duration(fattr.duration or 0.0),
             )
-            async with open_image(message.target_path) as img:
-                draw = await wrap_async(ImageDraw.Draw, img)
-                textbox = await wrap_async(
-                    draw.textbbox,
-                    (0, img.height),
-                    info,
-                    anchor="ls",
-                )
-                await wrap_async(draw.rectangle, textbox, fill=(10, 10, 10))
-                await wrap_async(draw.text, (0, img.height), info, anchor="ls")
-                await wrap_async(img.save, message.target_path)
+            await wrap_async(_render_overlay, message.target_path, info)
 
 
-@contextlib.asynccontextmanager
-async def open_image(fp: Path):
-    img = await wrap_async(Image.open, fp)
-    try:
-        yield img
-    finally:
-        await wrap_async(img.close)
+def _finalize_file(part: Path, target: Path, meta: Path, payload: bytes):
+    part.rename(target)
+    meta.parent.mkdir(parents=True, exist_ok=True)
+    meta.write_bytes(payload)
+
+
+@lru_cache(maxsize=64)
+def _text_mask(info: str):
+    probe = ImageDraw.Draw(Image.new("L", (1, 1)))
+    _, _, right, bottom = probe.textbbox((0, 0), info, anchor="la")
+    mask = Image.new("L", (right, bottom))
+    ImageDraw.Draw(mask).text((0, 0), info, fill=255, anchor="la")
+    return mask
+
+
+def _render_overlay(fp: Path, info: str):
+    mask = _text_mask(info)
+    with Image.open(fp) as img:
+        box = (0, img.height - mask.height, mask.width, img.height)
+        img.paste((10, 10, 10), box)
+        img.paste((255, 255, 255), box, mask)
+        img.save(fp)
 
 
 async def main(_args: "Sequence[str] | None" = None):
@@ -470,45 +549,36 @@ async def main(_args: "Sequence[str] | None" = None):
     logging.root.setLevel(logging.ERROR)
     setup_logging((pkg,), debug=args.debug)
     logger.debug("using args: %s", args)
-    match urlparse(args.session):
-        case (
-            ParseResult(
-                username=str(),
-                password=str(),
-                hostname=str(),
-                port=int(),
-                query=query,
-            ) as url
-        ):
-            if (proxy := args.proxy) is not None:
-                proxy = parse_proxy(urlparse(proxy))
-            qs = parse_qs(query)
-            session = sessions.create(url, args.ipv6)
-            client = TelegramClient(
-                session,
-                int(qs["api_id"][0], 10),
-                qs["api_hash"][0],
-                connection=ConnectionTcpAbridged,
-                use_ipv6=args.ipv6,
-                proxy=proxy,  # type: ignore
-                catch_up=False,
-                receive_updates=False,
-            )
-        case Never:
-            argparser.error(f"invalid or incomplete session: {Never}")
+    try:
+        su = sessions.parse_session_url(args.session)
+    except ValueError as e:
+        argparser.error(str(e))
+    if (proxy := args.proxy) is not None:
+        proxy = parse_proxy(urlparse(proxy))
+    session = sessions.create(su.url, args.ipv6)
+    client = TelegramClient(
+        session,
+        su.api_id,
+        su.api_hash,
+        connection=ConnectionTcpAbridged,
+        use_ipv6=args.ipv6,
+        proxy=proxy,  # type: ignore
+        catch_up=False,
+        receive_updates=False,
+    )
     with logging_redirect_tqdm((pkg,)), session:
         async with TGDownloader(args, client) as tgdl:
             await tgdl.run()
 
 
 def parse_url_group(s: str) -> tuple[str | int, int]:
-    for pat in (
-        re.compile(r"((?:https?://)?t.me/\w+)/(\d+)$"),
-        re.compile(r"(?:https?://)?t.me/c/(\d+)/(\d+)$"),
-    ):
-        if p := pat.match(s):
-            entity, msg_id = p.groups()
-            return int(entity) if entity.isdigit() else entity, int(msg_id)
+    url = s.removeprefix("https://").removeprefix("http://")
+    if url.startswith("t.me/"):
+        match url.removeprefix("t.me/").split("/"):
+            case ["c", cid, mid] if cid.isdigit() and mid.isdigit():
+                return int(cid, 10), int(mid, 10)
+            case [uname, mid] if uname and mid.isdigit():
+                return uname, int(mid, 10)
     raise ValueError(repr(s))
 
 
@@ -608,14 +678,8 @@ def parse_args(_args: "Sequence[str] | None" = None):
     )
 
     args = parser.parse_args(_args, Arguments())
-    if args.config:
-        config = Config.from_path(args.config, "yaml")
-        for f, v in args.__iter_fields__():
-            if isinstance(v, ARGDefault):
-                if (nv := getattr(config, f)) is not UNSET:
-                    setattr(args, f, nv)
-                else:
-                    setattr(args, f, unpack_default(v))
+    config = Config.from_path(args.config, "yaml") if args.config else Config()
+    config.apply(args)
     if args.mode is Mode.Unset:
         if args.file:
             args.mode = Mode.File
@@ -625,7 +689,9 @@ def parse_args(_args: "Sequence[str] | None" = None):
             args.mode = Mode.Interactive
     if args.mode is Mode.Interactive:
         entity = input("peer/entity id: ").strip()
-        args._ientity = int(entity, 10) if entity.isdigit() else entity
+        args._ientity = (
+            int(entity, 10) if entity.isascii() and entity.isdigit() else entity
+        )
         for s in input("message ids: ").split(","):
             match [s.strip() for s in s.partition("-")]:
                 case "", "", "":
@@ -648,9 +714,17 @@ def parse_args(_args: "Sequence[str] | None" = None):
 
 
 def __main__():
+    from asyncio.runners import run
+    from asyncio.tasks import eager_task_factory
+
     try:
-        import uvloop as aio  # type: ignore
+        from uvloop import new_event_loop  # type: ignore
     except ImportError:
-        import asyncio as aio
+        from asyncio.events import new_event_loop
+
+    def loop_factory():
+        loop = new_event_loop()
+        loop.set_task_factory(eager_task_factory)
+        return loop
 
-    aio.run(main())
+    run(main(), loop_factory=loop_factory)
@@ -2,13 +2,15 @@ __version__ = "r2026.01.03-4"
 
 
 import logging
+import os
 from argparse import ArgumentParser
+from asyncio.queues import Queue
+from asyncio.tasks import create_task
 from enum import Enum
 from pathlib import Path
-from urllib.parse import ParseResult, parse_qs, urlparse
+from urllib.parse import urlparse
 
-import aiofiles
-from msgspec import UNSET, json
+from msgspec import Raw, Struct, json, msgpack
 from telethon import TelegramClient
 from telethon.errors import ChannelPrivateError
 from telethon.network.connection.tcpabridged import ConnectionTcpAbridged
@@ -21,7 +23,7 @@ from telethon.tl.types import (
 from tqdm.contrib.logging import logging_redirect_tqdm
 
 from .src import ABC, ARGSBase, arc
-from .src.config import Config, Takeout
+from .src.config import Config, ExportFormat, Takeout
 from .src.log import setup_logging
 from .src.tg import sessions
 from .src.tg.messages.export import MessageExport
@@ -30,23 +32,30 @@ from .src.tg.utils import (
     iter_messages,
     parse_hashtags,
     resolve_entity,
+    tl_enc_hook,
 )
 from .src.types import ARGDefault, EntityStats, tqdm
 from .src.utils import (
+    LazyStr,
     add_misc_args,
     add_opts_args,
     encode_json_str,
     parse_proxy,
-    unpack_default,
+    wrap_async,
 )
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
+    from asyncio import Task
     from typing import Any, Sequence
 
     from telethon.hints import Entity
     from telethon.tl.custom import Dialog
 
+FLUSH_BYTES = 1 << 20
+
+_DELETE_REASONS = frozenset({"terms"})
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,9 +67,15 @@ class Mode(Enum):
         return f"{self.__class__.__name__}.{self.name}"
 
 
+class IdSpec(Struct):
+    entity: str | int
+    min_id: int = 0
+
+
 class Arguments(ARGSBase):
     archive: str
     debug: bool
+    export_format: ExportFormat
     export_path: str | None
     ipv6: bool
     min_ratio: float
@@ -72,13 +87,20 @@ class Arguments(ARGSBase):
 
     config: str | None
     ids: list[tuple[str | int, int]]
+    ids_file: str | None
 
 
 class TGExporter(ABC):
     _archive: arc.ArchiveBase
     _args: Arguments
+    _buf: bytearray
     _client: TelegramClient
     _client_orig: TelegramClient
+    _dbqueue: "Queue[MessageExport | None]"
+    _dbtask: "Task[None]"
+    _jenc: json.Encoder
+    _menc: msgpack.Encoder
+    _msgbar: tqdm["Any"]
     _out: Path
     _takeout: Takeout
     _wait_time: float | None
@@ -93,18 +115,28 @@ class TGExporter(ABC):
         self._args = args
         self._client = client
         self._export_ready = False
+        self._buf = bytearray()
+        self._jenc = json.Encoder(enc_hook=tl_enc_hook)
+        self._menc = msgpack.Encoder(enc_hook=tl_enc_hook)
         self._takeout = args.takeout
         self._wait_time = 0.0 if args.takeout.use else None
 
     async def _init_export(self):
         if not self._export_ready:
             self._out = Path(self._args.export_path or Path.cwd())
+            self._out.mkdir(parents=True, exist_ok=True)
             if self._args.to_db:
                 self._archive = await arc.create(
                     urlparse(self._args.archive)
                 ).__aenter__()
+                self._dbqueue = Queue(256)
+                self._dbtask = create_task(self._drain_db())
             self._export_ready = True
 
+    async def _drain_db(self):
+        while (row := await self._dbqueue.get()) is not None:
+            await self._archive.export(row)
+
     async def __aenter__(self):
         self._client = await self._client.__aenter__()
         if self._takeout.use:
@@ -117,8 +149,16 @@ class TGExporter(ABC):
             await self._client.__aexit__(*exc)
             self._client = self._client_orig
         await self._client.__aexit__(*exc)
-        if hasattr(self, "_archive"):
-            await self._archive.__aexit__(*exc)
+        try:
+            if hasattr(self, "_dbtask"):
+                if not self._dbtask.done():
+                    await self._dbqueue.put(None)
+                await self._dbtask
+        finally:
+            if hasattr(self, "_archive"):
+                await self._archive.__aexit__(*exc)
+            if hasattr(self, "_msgbar"):
+                self._msgbar.close()
 
     async def cleanup_chats(self):
         logger.info("cleaning up deleted chats")
@@ -129,38 +169,23 @@ class TGExporter(ABC):
                 restrict: list[RestrictionReason] | None = getattr(
                     entity, "restriction_reason", None
                 )
-                if isinstance(entity, (ChannelForbidden, ChatForbidden, UserEmpty)):
+                if isinstance(entity, (ChannelForbidden, ChatForbidden, UserEmpty)) or (
+                    restrict and any(r.reason in _DELETE_REASONS for r in restrict)
+                ):
+                    entity_json = LazyStr(lambda e=entity: encode_json_str(e.to_dict()))
                     try:
                         await dialog.delete()
-                        logger.info("deleted %s", encode_json_str(entity.to_dict()))
+                        logger.info("deleted %s", entity_json)
                     except Exception:
                         logger.warning(
                             "failed to delete %s due to error",
-                            encode_json_str(entity.to_dict()),
+                            entity_json,
                             exc_info=True,
                         )
-                    continue
-                if restrict:
-                    for reason in restrict:
-                        match reason:
-                            case RestrictionReason(reason="terms"):
-                                try:
-                                    await dialog.delete()
-                                    logger.info(
-                                        "deleted %s",
-                                        encode_json_str(entity.to_dict()),
-                                    )
-                                except Exception:
-                                    logger.warning(
-                                        "failed to delete %s due to error",
-                                        encode_json_str(entity.to_dict()),
-                                        exc_info=True,
-                                    )
-                                continue
             except Exception:
                 logger.warning(
                     "failed to process %s due to error",
-                    encode_json_str(dialog.to_dict()),
+                    LazyStr(lambda d=dialog: encode_json_str(d.to_dict())),
                     exc_info=True,
                 )
 
@@ -175,7 +200,22 @@ class TGExporter(ABC):
     ):
         await self._init_export()
         total = 0
-        async with aiofiles.open(self._out / f"{fn}.json", "wb", 0) as out:
+        fmt = self._args.export_format
+        match fmt:
+            case ExportFormat.JSON:
+                entity_raw = Raw(self._jenc.encode(tl_enc_hook(e)))
+            case ExportFormat.MSGPACK:
+                entity_raw = Raw(self._menc.encode(tl_enc_hook(e)))
+        buf = self._buf
+        buf.clear()
+        to_db = self._args.to_db
+        fd = await wrap_async(
+            os.open,
+            self._out / f"{fn}.{fmt}",
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+            0o666,
+        )
+        try:
             async for message, reply_id in iter_messages(
                 c,
                 e,
@@ -185,35 +225,72 @@ class TGExporter(ABC):
                 total += 1
                 if reply_id is None:
                     prog.update(1)
-                message_d = message.to_dict()
+                message_d = tl_enc_hook(message)
                 message_d["_hashtags"] = parse_hashtags(message)
-                message_d["peer_id"]["_entity"] = e.to_dict()
-                await out.write(json.encode(message_d) + b"\n")
-                if self._args.to_db:
-                    await self._archive.export(MessageExport.from_message(message))
+                message_d["peer_id"] = {
+                    **tl_enc_hook(message.peer_id),
+                    "_entity": entity_raw,
+                }
+                match fmt:
+                    case ExportFormat.JSON:
+                        self._jenc.encode_into(message_d, buf, len(buf))
+                        buf.append(0x0A)
+                    case ExportFormat.MSGPACK:
+                        start = len(buf)
+                        buf += b"\x00\x00\x00\x00"
+                        self._menc.encode_into(message_d, buf, start + 4)
+                        buf[start : start + 4] = (len(buf) - start - 4).to_bytes(
+                            4, "big"
+                        )
+                if len(buf) >= FLUSH_BYTES:
+                    await wrap_async(_writeall, fd, buf)
+                    buf.clear()
+                if to_db:
+                    if self._dbtask.done():
+                        # the drain task only exits early on error; re-raise it
+                        # instead of blocking on a queue nobody consumes
+                        self._dbtask.result()
+                    await self._dbqueue.put(MessageExport.from_message(message))
+            if buf:
+                await wrap_async(_writeall, fd, buf)
+        finally:
+            await wrap_async(os.close, fd)
         return total
 
     async def export_with_fallback(self, e: "Entity", m: int, s: EntityStats):
         await self._init_export()
         fn = f"@{s.username}" if s.username else str(s.id)
-        with tqdm(desc=str(s), initial=m, total=s.messages) as prog:
-            if (
-                await self.export_chat(self._client, e, m, fn, prog, self._wait_time)
-                == 0
-                and self._takeout is Takeout.FALLBACK
-            ):
-                logger.debug(
-                    "got 0 messages for %s using takeout session, "
-                    "falling back to normal session",
-                    s,
-                )
-                await self.export_chat(self._client_orig, e, m, fn, prog, None)
+        try:
+            prog = self._msgbar
+        except AttributeError:
+            prog = self._msgbar = tqdm()
+        prog.set_description(str(s))
+        prog.reset(s.messages)
+        prog.update(m)
+        if (
+            await self.export_chat(self._client, e, m, fn, prog, self._wait_time) == 0
+            and self._takeout is Takeout.FALLBACK
+        ):
+            logger.debug(
+                "got 0 messages for %s using takeout session, "
+                "falling back to normal session",
+                s,
+            )
+            await self.export_chat(self._client_orig, e, m, fn, prog, None)
 
     async def export_dialogs(self, mr: float):
         await self._init_export()
-        td = getattr(await self._client.get_dialogs(0), "total", 0)
+        td_task = create_task(self._client.get_dialogs(0))
+        prog: tqdm["Dialog"] = tqdm(self._client.iter_dialogs(), "Dialogs")
+
+        def set_total(task: "Task[Any]"):
+            if not task.cancelled() and task.exception() is None:
+                prog.total = getattr(task.result(), "total", 0)
+                prog.refresh()
+
+        td_task.add_done_callback(set_total)
         dialog: Dialog
-        async for dialog in tqdm(self._client.iter_dialogs(), "Dialogs", td):
+        async for dialog in prog:
             try:
                 entity, stats = await resolve_entity(
                     self._client, dialog.input_entity, with_stats=True
@@ -229,7 +306,9 @@ class TGExporter(ABC):
                 continue
             except Exception:
                 logger.warning(
-                    "skipping %s due to error", dialog.stringify(), exc_info=True
+                    "skipping %s due to error",
+                    LazyStr(dialog.stringify),
+                    exc_info=True,
                 )
 
     async def export(self):
@@ -253,38 +332,37 @@ class TGExporter(ABC):
                         )
 
 
+def _writeall(fd: int, buf: bytearray):
+    with memoryview(buf) as view:
+        while view:
+            n = os.write(fd, view)
+            with view:
+                view = view[n:]
+
+
 async def main(_args: "Sequence[str] | None" = None):
     argparser, args = parse_args(_args)
     pkg = logging.getLogger(__package__)
     logging.root.setLevel(logging.ERROR)
     setup_logging((pkg,), debug=args.debug)
     logger.debug("using args: %s", args)
-    match urlparse(args.session):
-        case (
-            ParseResult(
-                username=str(),
-                password=str(),
-                hostname=str(),
-                port=int(),
-                query=query,
-            ) as url
-        ):
-            if (proxy := args.proxy) is not None:
-                proxy = parse_proxy(urlparse(proxy))
-            qs = parse_qs(query)
-            session = sessions.create(url, args.ipv6)
-            client = TelegramClient(
-                session,
-                int(qs["api_id"][0], 10),
-                qs["api_hash"][0],
-                connection=ConnectionTcpAbridged,
-                use_ipv6=args.ipv6,
-                proxy=proxy,  # type: ignore
-                catch_up=False,
-                receive_updates=False,
-            )
-        case Never:
-            argparser.error(f"invalid or incomplete session: {Never}")
+    try:
+        su = sessions.parse_session_url(args.session)
+    except ValueError as e:
+        argparser.error(str(e))
+    if (proxy := args.proxy) is not None:
+        proxy = parse_proxy(urlparse(proxy))
+    session = sessions.create(su.url, args.ipv6)
+    client = TelegramClient(
+        session,
+        su.api_id,
+        su.api_hash,
+        connection=ConnectionTcpAbridged,
+        use_ipv6=args.ipv6,
+        proxy=proxy,  # type: ignore
+        catch_up=False,
+        receive_updates=False,
+    )
     with logging_redirect_tqdm((pkg,)), session:
         async with TGExporter(args, client) as tgex:
             match args.mode:
@@ -296,7 +374,7 @@ async def main(_args: "Sequence[str] | None" = None):
 
 def parse_ids(i: str) -> tuple[str | int, int]:
     e, _, m = i.partition("/")
-    pe = int(e, 10) if e.isdigit() else e
+    pe = int(e, 10) if e.isascii() and e.isdigit() else e
     if m:
         return pe, int(m, 10) - 1
     return pe, 0
@@ -335,6 +413,22 @@ def parse_args(_args: "Sequence[str] | None" = None):
         metavar="NUM",
         dest="min_ratio",
     )
+    exports.add_argument(
+        "--format",
+        type=ExportFormat,
+        choices=tuple(ExportFormat),
+        default=ARGDefault(ExportFormat.JSON),
+        help="exported file format (default: %(default)s)",
+        metavar="FMT",
+        dest="export_format",
+    )
+    exports.add_argument(
+        "--ids-file",
+        default=None,
+        help="json file with ids to export",
+        metavar="PATH",
+        dest="ids_file",
+    )
     exports.add_argument(
         "--to-db",
         action="store_true",
@@ -349,21 +443,20 @@ def parse_args(_args: "Sequence[str] | None" = None):
     add_opts_args(sub_cleanup)
 
     args = parser.parse_args(_args, Arguments())
-    if args.config:
-        config = Config.from_path(args.config, "yaml")
-        for f, v in args.__iter_fields__():
-            if isinstance(v, ARGDefault):
-                if (nv := getattr(config, f)) is not UNSET:
-                    setattr(args, f, nv)
-                else:
-                    setattr(args, f, unpack_default(v))
+    config = Config.from_path(args.config, "yaml") if args.config else Config()
+    config.apply(args)
+    if getattr(args, "ids_file", None):
+        specs = json.decode(Path(args.ids_file).read_bytes(), type=list[IdSpec])
+        args.ids.extend((s.entity, s.min_id) for s in specs)
     return parser, args
 
 
 def __main__():
+    from asyncio.runners import run
+
     try:
-        import uvloop as aio  # type: ignore
+        from uvloop import new_event_loop  # type: ignore
     except ImportError:
-        import asyncio as aio
+        from asyncio.events import new_event_loop
 
-    aio.run(main())
+    run(main(), loop_factory=new_event_loop)
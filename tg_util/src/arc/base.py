@@ -1,17 +1,26 @@
+from collections import OrderedDict
+
 from tg_util.src import ABC, abstractmethod
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
     from asyncio import Lock
+    from collections.abc import Iterable
     from typing import Any, Self
     from urllib.parse import ParseResult
 
     from tg_util.src.tg.messages.export import MessageExport
 
+CACHE_SIZE = 4096
+PENDING_MAX = 128
+
 
 class ArchiveBase(ABC):
     _params: "ParseResult"
     _lock: "Lock"
+    _attr_cache: "OrderedDict[tuple[Any, ...], tuple[Any, Any, Any]]"
+    _id_cache: "OrderedDict[int, Any]"
+    _pending: "list[tuple[Any, ...]]"
 
     @abstractmethod
     def __init__(self, params: "ParseResult") -> None: ...
@@ -24,7 +33,6 @@ class ArchiveBase(ABC):
     @abstractmethod
     async def prepare(self) -> None: ...
 
-    @abstractmethod
     async def check_attr(
         self,
         hash: bytes,
@@ -32,13 +40,67 @@ class ArchiveBase(ABC):
         height: int | None,
         size: int | None,
         duration: float | None,
+    ):
+        """memoized _check_attr; completed rows never change, so only
+        hits are cached and no write-path invalidation is needed"""
+        key = (hash, width, height, size, duration)
+        try:
+            cache = self._attr_cache
+            cache.move_to_end(key)
+            return cache[key]
+        except AttributeError:
+            cache = self._attr_cache = OrderedDict()
+        except KeyError:
+            pass
+        if width is None and height is None and size is None and duration is None:
+            # the attribute branch is provably false; hit the hash index only
+            r = await self._check_attr_hash(hash)
+        else:
+            r = await self._check_attr(hash, width, height, size, duration)
+        if r is None:
+            return None
+        cache[key] = r
+        if len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+        return r
+
+    async def check_id(self, file_id: int):
+        """memoized _check_id, same caching rules as check_attr"""
+        try:
+            cache = self._id_cache
+            cache.move_to_end(file_id)
+            return cache[file_id]
+        except AttributeError:
+            cache = self._id_cache = OrderedDict()
+        except KeyError:
+            pass
+        if (msg := await self._check_id(file_id)) is None:
+            return None
+        cache[file_id] = msg
+        if len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+        return msg
+
+    @abstractmethod
+    async def _check_attr(
+        self,
+        hash: bytes,
+        width: int | None,
+        height: int | None,
+        size: int | None,
+        duration: float | None,
     ) -> "tuple[Any, Any, Any] | None": ...
     @abstractmethod
-    async def check_id(self, file_id: int) -> "Any | None": ...
+    async def _check_attr_hash(self, hash: bytes) -> "tuple[Any, Any, Any] | None": ...
+    @abstractmethod
+    async def _check_id(self, file_id: int) -> "Any | None": ...
+    @abstractmethod
+    async def all_ids(self) -> set[int]: ...
     @abstractmethod
     async def set_complete(self, file_id: int) -> None: ...
-
     @abstractmethod
+    async def set_complete_many(self, file_ids: "Iterable[int]") -> None: ...
+
     async def update(
         self,
         file_id: int,
@@ -52,6 +114,40 @@ class ArchiveBase(ABC):
         size: int | None,
         duration: float | None,
         type: str,
-    ) -> None: ...
+    ):
+        """buffer the row; _update_many flushes a full batch in one trip"""
+        try:
+            pending = self._pending
+        except AttributeError:
+            pending = self._pending = []
+        pending.append(
+            (
+                file_id,
+                msg,
+                msg_id,
+                chat_id,
+                chat_username,
+                hash,
+                width,
+                height,
+                size,
+                duration,
+                type,
+            )
+        )
+        if len(pending) >= PENDING_MAX:
+            await self.flush()
+
+    async def flush(self):
+        try:
+            rows = self._pending
+        except AttributeError:
+            return
+        if rows:
+            self._pending = []
+            await self._update_many(rows)
+
+    @abstractmethod
+    async def _update_many(self, rows: "list[tuple[Any, ...]]") -> None: ...
     @abstractmethod
     async def export(self, message: "MessageExport") -> None: ...
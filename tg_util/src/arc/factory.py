@@ -2,19 +2,26 @@ TYPE_CHECKING = False
 if TYPE_CHECKING:
     from urllib.parse import ParseResult
 
+    from .base import ArchiveBase
+
+_ARC_CACHE: "dict[str, type[ArchiveBase]]" = {}
+
 
 def create(url: "ParseResult"):
-    match url.scheme.lower():
-        case "mysqlx":
-            from .mysqlx import MySQLXArchive as arc
+    scheme = url.scheme.lower()
+    if (arc := _ARC_CACHE.get(scheme)) is None:
+        match scheme:
+            case "mysqlx":
+                from .mysqlx import MySQLXArchive as arc
 
-        case "sqlite" | "sqlite3":
-            from .sqlite import SQLiteArchive as arc
+            case "sqlite" | "sqlite3":
+                from .sqlite import SQLiteArchive as arc
 
-        case "postgresql":
-            from .pg import PSQLArchive as arc
+            case "postgresql":
+                from .pg import PSQLArchive as arc
 
-        case Never:
-            err = f"unknown database scheme: {Never}"
-            raise ValueError(err)
+            case Never:
+                err = f"unknown database scheme: {Never}"
+                raise ValueError(err)
+        _ARC_CACHE[scheme] = arc
     return arc(url)
@@ -1,8 +1,7 @@
 from asyncio import Lock
-from datetime import datetime
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING, Any
 
-from mysqlx import Row, RowResult, Session, Table, get_session
+from mysqlx import Session, Table, expr, get_session
 from mysqlx.errors import OperationalError
 
 from tg_util.src.utils import wrap_async
@@ -10,12 +9,19 @@ from tg_util.src.utils import wrap_async
 from .base import ArchiveBase
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from urllib.parse import ParseResult
 
+    from mysqlx import DeleteStatement, Row, RowResult, SelectStatement
+
     from tg_util.src.tg.messages.export import MessageExport
 
 
 class MySQLXArchive(ArchiveBase):
+    _del_conflict: "DeleteStatement"
+    _sel_attr: "SelectStatement"
+    _sel_hash: "SelectStatement"
+    _sel_id: "SelectStatement"
     _session: Session
     _table: Table
 
@@ -25,28 +31,47 @@ class MySQLXArchive(ArchiveBase):
 
     async def __aenter__(self):
         schema_name = self._params.path.strip("/")
-        session = await wrap_async(
-            get_session,
-            user=self._params.username,
-            password=self._params.password,
-            host=self._params.hostname,
-            port=self._params.port,
-            schema=schema_name,
-            use_pure=True,
-        )
+        params = {
+            "user": self._params.username,
+            "password": self._params.password,
+            "host": self._params.hostname,
+            "port": self._params.port,
+            "schema": schema_name,
+        }
+        try:
+            # prefer the C extension protocol codec when it is installed
+            session = await wrap_async(get_session, use_pure=False, **params)
+        except Exception:
+            session = await wrap_async(get_session, use_pure=True, **params)
         self._session = await wrap_async(session.__enter__)
         schema = await wrap_async(session.get_schema, schema_name)
-        self._table = await wrap_async(schema.get_table, "_archive_")
+        table = self._table = await wrap_async(schema.get_table, "_archive_")
+        # statement objects are rebindable; re-executing the same object
+        # lets the connector promote it to a server-side prepared statement
+        self._sel_attr = table.select("msg", "hash", "downloaded").where(
+            "downloaded is not null and ("
+            "hash = :hash or (width = :width and "
+            "height = :height and size = :size and "
+            "duration = :duration))"
+        )
+        self._sel_hash = table.select("msg", "hash", "downloaded").where(
+            "downloaded is not null and hash = :hash"
+        )
+        self._sel_id = table.select("msg").where(
+            "file_id = :fid and downloaded is not null"
+        )
+        self._del_conflict = table.delete().where("file_id = :fid or hash = :hash")
         return self
 
     async def __aexit__(self, *_exc: Any):
+        await self.flush()
         await wrap_async(self._session.commit)
         return await wrap_async(self._session.__exit__, *_exc)
 
     async def prepare(self):
         return
 
-    async def check_attr(
+    async def _check_attr(
         self,
         hash: bytes,
         width: int | None,
@@ -54,64 +79,63 @@ class MySQLXArchive(ArchiveBase):
         size: int | None,
         duration: float | None,
     ):
-        select = (
-            self._table.select("msg", "hash", "downloaded")
-            .where(
-                "downloaded is not null and ("
-                "hash = :hash or (width = :width and "
-                "height = :height and size = :size and "
-                "duration = :duration))"
+        async with self._lock:
+            result: RowResult = await wrap_async(
+                self._sel_attr.bind("hash", hash)
+                .bind("width", width)
+                .bind("height", height)
+                .bind("size", size)
+                .bind("duration", duration)
+                .execute
             )
-            .bind("hash", hash)
-            .bind("width", width)
-            .bind("height", height)
-            .bind("size", size)
-            .bind("duration", duration)
-        )
+            if row := await wrap_async(result.fetch_one):
+                return row[0], row[1], row[2]
+
+    async def _check_attr_hash(self, hash: bytes):
         async with self._lock:
-            result = cast("RowResult", await wrap_async(select.execute))
-            if row := cast("Row | None", await wrap_async(result.fetch_one)):
+            result: RowResult = await wrap_async(
+                self._sel_hash.bind("hash", hash).execute
+            )
+            if row := await wrap_async(result.fetch_one):
                 return row[0], row[1], row[2]
 
-    async def check_id(self, file_id: int):
+    async def _check_id(self, file_id: int):
         async with self._lock:
-            result = cast(
-                "RowResult",
-                await wrap_async(
-                    self._table.select("msg")
-                    .where("file_id = :fid and downloaded is not null")
-                    .bind("fid", file_id)
-                    .execute,
-                ),
+            result: RowResult = await wrap_async(
+                self._sel_id.bind("fid", file_id).execute
             )
-            if row := cast("Row | None", await wrap_async(result.fetch_one)):
+            if row := await wrap_async(result.fetch_one):
                 return row[0]
 
+    async def all_ids(self):
+        async with self._lock:
+            result: RowResult = await wrap_async(self._table.select("file_id").execute)
+            rows: "list[Row]" = await wrap_async(result.fetch_all)
+        return {row[0] for row in rows}
+
     async def set_complete(self, file_id: int):
         async with self._lock:
             await wrap_async(
                 self._table.update()
-                .set("downloaded", datetime.now().isoformat(timespec="seconds"))
+                .set("downloaded", expr("NOW()"))
                 .where("file_id = :fid")
                 .bind("fid", file_id)
                 .execute,
             )
 
-    async def update(
-        self,
-        file_id: int,
-        msg: str,
-        msg_id: int,
-        chat_id: int,
-        chat_username: str | None,
-        hash: bytes,
-        width: int | None,
-        height: int | None,
-        size: int | None,
-        duration: float | None,
-        type: str,
-    ):
-        insert = self._table.insert(
+    async def set_complete_many(self, file_ids: "Iterable[int]"):
+        async with self._lock:
+            for fid in file_ids:
+                await wrap_async(
+                    self._table.update()
+                    .set("downloaded", expr("NOW()"))
+                    .where("file_id = :fid")
+                    .bind("fid", fid)
+                    .execute,
+                )
+
+    async def _update_many(self, rows: "list[tuple[Any, ...]]"):
+        columns = (
             "file_id",
             "msg",
             "msg_id",
@@ -123,31 +147,26 @@ class MySQLXArchive(ArchiveBase):
             "size",
             "duration",
             "type",
-        ).values(
-            file_id,
-            msg,
-            msg_id,
-            chat_id,
-            chat_username,
-            hash,
-            width,
-            height,
-            size,
-            duration,
-            type,
         )
+        insert = self._table.insert(*columns)
+        for row in rows:
+            insert = insert.values(*row)
         async with self._lock:
             try:
                 await wrap_async(insert.execute)
             except OperationalError:
-                await wrap_async(
-                    self._table.delete()
-                    .where("file_id = :fid or hash = :hash")
-                    .bind("fid", file_id)
-                    .bind("hash", hash)
-                    .execute,
-                )
-                await wrap_async(insert.execute)
+                # retry row by row, replacing whatever the batch tripped on
+                for row in rows:
+                    insert = self._table.insert(*columns).values(*row)
+                    try:
+                        await wrap_async(insert.execute)
+                    except OperationalError:
+                        await wrap_async(
+                            self._del_conflict.bind("fid", row[0])
+                            .bind("hash", row[5])
+                            .execute,
+                        )
+                        await wrap_async(insert.execute)
 
     async def export(self, message: "MessageExport"):
         raise NotImplementedError
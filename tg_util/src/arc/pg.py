@@ -1,32 +1,35 @@
-from asyncio import Lock
-from datetime import datetime
-
-from asyncpg import Connection, Record, UniqueViolationError, connect
+from asyncpg import Pool, Record, UniqueViolationError, create_pool
 
 from .base import ArchiveBase
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from typing import Any
     from urllib.parse import ParseResult
 
     from _typeshed import Unused
 
     from tg_util.src.tg.messages.export import MessageExport
 
+EXPORT_MAX = 256
+
 
 class PSQLArchive(ArchiveBase):
-    _conn: "Connection[Record]"
+    _export_buf: "list[tuple[Any, ...]]"
+    _pool: "Pool[Record]"
 
     def __init__(self, params: "ParseResult"):
         self._params = params
-        self._lock = Lock()
 
     async def __aenter__(self):
-        self._conn = await connect(self._params.geturl())
+        self._pool = await create_pool(self._params.geturl(), min_size=1, max_size=4)
         return self
 
     async def __aexit__(self, *_exc: "Unused"):
-        await self._conn.close()
+        await self.flush()
+        await self._flush_export()
+        await self._pool.close()
 
     async def prepare(self):
         q = (
@@ -46,11 +49,12 @@ class PSQLArchive(ArchiveBase):
                 CONSTRAINT _archive__pk PRIMARY KEY (file_id),
                 CONSTRAINT _archive__unique UNIQUE (hash)
             );"""
-            'CREATE INDEX IF NOT EXISTS "_archive__type_IDX" ON "_archive_" ("type");'
+            'CREATE INDEX IF NOT EXISTS "_archive__whsd_idx" ON "_archive_" '
+            "(width, height, size, duration) WHERE downloaded IS NOT NULL;"
         )
-        await self._conn.execute(q)
+        await self._pool.execute(q)
 
-    async def check_attr(
+    async def _check_attr(
         self,
         hash: bytes,
         width: int | None,
@@ -58,91 +62,117 @@ class PSQLArchive(ArchiveBase):
         size: int | None,
         duration: float | None,
     ):
-        async with self._lock:
-            r = await self._conn.fetchrow(
-                "select msg, hash, downloaded from _archive_ where "
-                "downloaded is not null and (hash = $1 or "
-                "(width = $2 and height = $3 and size = $4 and duration = $5))",
-                hash,
-                width,
-                height,
-                size,
-                duration,
-            )
+        r = await self._pool.fetchrow(
+            "select msg, hash, downloaded from _archive_ where "
+            "downloaded is not null and (hash = $1 or "
+            "(width = $2 and height = $3 and size = $4 and duration = $5))",
+            hash,
+            width,
+            height,
+            size,
+            duration,
+        )
+        if r:
+            return r[0], r[1], r[2]
+
+    async def _check_attr_hash(self, hash: bytes):
+        r = await self._pool.fetchrow(
+            "select msg, hash, downloaded from _archive_ where "
+            "downloaded is not null and hash = $1",
+            hash,
+        )
         if r:
             return r[0], r[1], r[2]
 
-    async def check_id(self, file_id: int):
-        async with self._lock:
-            return await self._conn.fetchval(
-                "select msg from _archive_ where file_id = $1 and downloaded is not null",
-                file_id,
-            )
+    async def _check_id(self, file_id: int):
+        return await self._pool.fetchval(
+            "select msg from _archive_ where file_id = $1 and downloaded is not null",
+            file_id,
+        )
+
+    async def all_ids(self):
+        rows = await self._pool.fetch("select file_id from _archive_")
+        return {row[0] for row in rows}
 
     async def set_complete(self, file_id: int):
-        async with self._lock:
-            await self._conn.execute(
-                "update _archive_ set downloaded = $1 where file_id = $2",
-                datetime.now(),
-                file_id,
-            )
-
-    async def update(
-        self,
-        file_id: int,
-        msg: str,
-        msg_id: int,
-        chat_id: int,
-        chat_username: str | None,
-        hash: bytes,
-        width: int | None,
-        height: int | None,
-        size: int | None,
-        duration: float | None,
-        type: str,
-    ):
+        await self._pool.execute(
+            "update _archive_ set downloaded = current_timestamp where file_id = $1",
+            file_id,
+        )
+
+    async def set_complete_many(self, file_ids: "Iterable[int]"):
+        await self._pool.execute(
+            "update _archive_ set downloaded = current_timestamp "
+            "where file_id = any($1::int8[])",
+            list(file_ids),
+        )
+
+    async def _update_many(self, rows: "list[tuple[Any, ...]]"):
         insert = (
             "insert into _archive_ (file_id, msg, msg_id, chat_id, "
             "username, hash, width, height, size, duration, type) "
-            "values ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)",
-            file_id,
-            msg,
-            msg_id,
-            chat_id,
-            chat_username,
-            hash,
-            width,
-            height,
-            size,
-            duration,
-            type,
+            "values ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11) "
+            "on conflict (file_id) do update set msg = excluded.msg, "
+            "msg_id = excluded.msg_id, chat_id = excluded.chat_id, "
+            "username = excluded.username, hash = excluded.hash, "
+            "width = excluded.width, height = excluded.height, "
+            "size = excluded.size, duration = excluded.duration, "
+            "type = excluded.type"
         )
-        async with self._lock:
+        async with self._pool.acquire() as conn:
             try:
-                await self._conn.execute(*insert)
+                await conn.executemany(insert, rows)
             except UniqueViolationError:
-                async with self._conn.transaction():
-                    await self._conn.execute(
-                        "delete from _archive_ where file_id = $1 or hash = $2",
-                        file_id,
-                        hash,
-                    )
-                    await self._conn.execute(*insert)
+                # the hash constraint can still trip when another file_id
+                # owns the same hash; retry row by row and replace it
+                for row in rows:
+                    try:
+                        await conn.execute(insert, *row)
+                    except UniqueViolationError:
+                        async with conn.transaction():
+                            await conn.execute(
+                                "delete from _archive_ where file_id = $1 or hash = $2",
+                                row[0],
+                                row[5],
+                            )
+                            await conn.execute(insert, *row)
 
     async def export(self, message: "MessageExport"):
+        try:
+            buf = self._export_buf
+        except AttributeError:
+            buf = self._export_buf = []
+        buf.append(message.as_tuple())
+        if len(buf) >= EXPORT_MAX:
+            await self._flush_export()
+
+    async def _flush_export(self):
+        try:
+            rows = self._export_buf
+        except AttributeError:
+            return
+        if not rows:
+            return
+        self._export_buf = []
         insert = (
             "insert into _all_chats_ values ($1, $2, $3, $4, $5, $6, $7, "
             "$8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, "
-            "$20, $21, $22, $23, $24, $25, $26, $27, $28)",
-            *message.as_tuple(),
+            "$20, $21, $22, $23, $24, $25, $26, $27, $28)"
         )
-        try:
-            await self._conn.execute(*insert)
-        except UniqueViolationError:
-            async with self._conn.transaction():
-                await self._conn.execute(
-                    "delete from _all_chats_ where chat_id = $1 and message_id = $2",
-                    message.chat_id,
-                    message.message_id,
-                )
-                await self._conn.execute(*insert)
+        async with self._pool.acquire() as conn:
+            try:
+                await conn.executemany(insert, rows)
+            except UniqueViolationError:
+                # retry row by row, replacing whatever the batch tripped on
+                for row in rows:
+                    try:
+                        await conn.execute(insert, *row)
+                    except UniqueViolationError:
+                        async with conn.transaction():
+                            await conn.execute(
+                                "delete from _all_chats_ "
+                                "where chat_id = $1 and message_id = $2",
+                                row[1],
+                                row[4],
+                            )
+                            await conn.execute(insert, *row)
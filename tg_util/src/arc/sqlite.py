@@ -1,6 +1,4 @@
 from asyncio import Lock
-from contextlib import asynccontextmanager
-from datetime import datetime
 from sqlite3 import Connection, connect
 
 from tg_util.src.utils import wrap_async
@@ -9,6 +7,7 @@ from .base import ArchiveBase
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from typing import Any
     from urllib.parse import ParseResult
 
@@ -32,38 +31,19 @@ class SQLiteArchive(ArchiveBase):
         )
         self._conn = await wrap_async(conn.__enter__)
         if db != ":memory:":
-            async with self.get_cursor() as cursor:
-                await wrap_async(cursor.execute, "PRAGMA optimize")
+            await wrap_async(_execute, self._conn, "PRAGMA optimize", ())
         return self
 
     async def __aexit__(self, *_exc: "Any"):
+        await self.flush()
         await wrap_async(self._conn.commit)
+        await wrap_async(_execute, self._conn, "PRAGMA optimize", ())
         await wrap_async(self._conn.__exit__, *_exc)
 
-    @asynccontextmanager
-    async def get_cursor(self):
-        cursor = await wrap_async(self._conn.cursor)
-        try:
-            yield cursor
-        finally:
-            await wrap_async(cursor.close)
-
     async def prepare(self):
-        async with self.get_cursor() as cursor:
-            await wrap_async(
-                cursor.executescript,
-                "PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL;",
-            )
-            await wrap_async(
-                cursor.execute,
-                "CREATE TABLE IF NOT EXISTS _archive_"
-                "(file_id INTEGER PRIMARY KEY NOT NULL, msg TEXT NOT NULL, msg_id INTEGER NOT NULL, "
-                "chat_id INTEGER NOT NULL, chat_username TEXT, hash BLOB NOT NULL, width INTEGER, "
-                "height INTEGER, size INTEGER, duration REAL, downloaded TEXT DEFAULT NULL, "
-                "type TEXT NOT NULL) STRICT",
-            )
+        await wrap_async(_prepare_db, self._conn)
 
-    async def check_attr(
+    async def _check_attr(
         self,
         hash: bytes,
         width: int | None,
@@ -71,72 +51,135 @@ class SQLiteArchive(ArchiveBase):
         size: int | None,
         duration: float | None,
     ) -> "tuple[Any, Any, Any] | None":
-        async with self._lock, self.get_cursor() as cursor:
-            await wrap_async(
-                cursor.execute,
+        async with self._lock:
+            return await wrap_async(
+                _fetchone,
+                self._conn,
                 "select msg, hash, downloaded from _archive_ where "
                 "downloaded is not null and (hash = ? or "
                 "(width = ? and height = ? and size = ? and duration = ?))",
                 (hash, width, height, size, duration),
             )
-            return await wrap_async(cursor.fetchone)
 
-    async def check_id(self, file_id: int):
-        async with self._lock, self.get_cursor() as cursor:
-            await wrap_async(
-                cursor.execute,
+    async def _check_attr_hash(self, hash: bytes) -> "tuple[Any, Any, Any] | None":
+        async with self._lock:
+            return await wrap_async(
+                _fetchone,
+                self._conn,
+                "select msg, hash, downloaded from _archive_ where "
+                "downloaded is not null and hash = ?",
+                (hash,),
+            )
+
+    async def _check_id(self, file_id: int):
+        async with self._lock:
+            if row := await wrap_async(
+                _fetchone,
+                self._conn,
                 "select msg from _archive_ where file_id = ? and "
                 "downloaded is not null",
                 (file_id,),
-            )
-            if row := await wrap_async(cursor.fetchone):
+            ):
                 return row[0]
 
+    async def all_ids(self):
+        async with self._lock:
+            rows = await wrap_async(
+                _fetchall, self._conn, "select file_id from _archive_", ()
+            )
+        return {row[0] for row in rows}
+
     async def set_complete(self, file_id: int):
-        async with self._lock, self.get_cursor() as cursor:
+        async with self._lock:
             await wrap_async(
-                cursor.execute,
-                "update _archive_ set downloaded = ? where file_id = ?",
-                (datetime.now().isoformat(" ", "seconds"), file_id),
+                _execute,
+                self._conn,
+                "update _archive_ set downloaded = datetime('now', 'localtime') "
+                "where file_id = ?",
+                (file_id,),
             )
 
-    async def update(
-        self,
-        file_id: int,
-        msg: str,
-        msg_id: int,
-        chat_id: int,
-        chat_username: str | None,
-        hash: bytes,
-        width: int | None,
-        height: int | None,
-        size: int | None,
-        duration: float | None,
-        type: str,
-    ):
-        async with self._lock, self.get_cursor() as cursor:
-            q = (
-                "replace into _archive_ (file_id, msg, msg_id, chat_id, "
-                "chat_username, hash, width, height, size, duration, type) "
-                "values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    async def set_complete_many(self, file_ids: "Iterable[int]"):
+        async with self._lock:
+            await wrap_async(
+                _executemany,
+                self._conn,
+                "update _archive_ set downloaded = datetime('now', 'localtime') "
+                "where file_id = ?",
+                [(fid,) for fid in file_ids],
             )
+
+    async def _update_many(self, rows: "list[tuple[Any, ...]]"):
+        async with self._lock:
             await wrap_async(
-                cursor.execute,
-                q,
-                (
-                    file_id,
-                    msg,
-                    msg_id,
-                    chat_id,
-                    chat_username,
-                    hash,
-                    width,
-                    height,
-                    size,
-                    duration,
-                    type,
-                ),
+                _executemany,
+                self._conn,
+                "replace into _archive_ (file_id, msg, msg_id, chat_id, "
+                "chat_username, hash, width, height, size, duration, type) "
+                "values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
             )
 
     async def export(self, message: "MessageExport"):
         raise NotImplementedError
+
+
+# whole cursor lifecycles run as single executor jobs so each query
+# costs one thread hop instead of one per cursor/execute/fetch/close
+
+
+def _execute(conn: Connection, q: str, params: "Any"):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(q, params)
+    finally:
+        cursor.close()
+
+
+def _executemany(conn: Connection, q: str, params: "Any"):
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(q, params)
+    finally:
+        cursor.close()
+
+
+def _fetchone(conn: Connection, q: str, params: "Any"):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(q, params)
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def _fetchall(conn: Connection, q: str, params: "Any"):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(q, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _prepare_db(conn: Connection):
+    cursor = conn.cursor()
+    try:
+        cursor.executescript(
+            "PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL; "
+            "PRAGMA mmap_size = 268435456; PRAGMA cache_size = -65536; "
+            "PRAGMA temp_store = MEMORY;"
+        )
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS _archive_"
+            "(file_id INTEGER PRIMARY KEY NOT NULL, msg TEXT NOT NULL, msg_id INTEGER NOT NULL, "
+            "chat_id INTEGER NOT NULL, chat_username TEXT, hash BLOB NOT NULL, width INTEGER, "
+            "height INTEGER, size INTEGER, duration REAL, downloaded TEXT DEFAULT NULL, "
+            "type TEXT NOT NULL) STRICT"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS _archive__whsd_idx ON _archive_ "
+            "(width, height, size, duration) WHERE downloaded IS NOT NULL"
+        )
+    finally:
+        cursor.close()
@@ -2,7 +2,11 @@ from enum import Enum
 
 from msgspec import UNSET, UnsetType
 
-from .types import Decodable
+from .types import ARGDefault, Decodable
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .types import ARGSBase
 
 
 class Takeout(Enum):
@@ -10,6 +14,8 @@ class Takeout(Enum):
     FALSE = "false"
     FALLBACK = "fallback"
 
+    use: bool
+
     def __repr__(self):
         return f"{self.__class__.__name__}.{self.name}"
 
@@ -19,9 +25,20 @@ class Takeout(Enum):
     def __bool__(self):
         return self.use
 
-    @property
-    def use(self):
-        return self is Takeout.TRUE or self is Takeout.FALLBACK
+
+for _t in Takeout:
+    _t.use = _t is not Takeout.FALSE
+
+
+class ExportFormat(Enum):
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}.{self.name}"
+
+    def __str__(self):
+        return self.value
 
 
 class Config(Decodable):
@@ -31,6 +48,7 @@ class Config(Decodable):
     debug: bool | UnsetType = UNSET
     download_path: str | UnsetType = UNSET
     download_threads: int | UnsetType = UNSET
+    export_format: ExportFormat | UnsetType = UNSET
     export_path: str | UnsetType = UNSET
     ipv6: bool | UnsetType = UNSET
     min_ratio: float | UnsetType = UNSET
@@ -42,3 +60,15 @@ class Config(Decodable):
     takeout: Takeout | UnsetType = UNSET
     thumbs_only: bool | UnsetType = UNSET
     to_db: bool | UnsetType = UNSET
+
+    def apply(self, args: "ARGSBase"):
+        """unpack any ARGDefault left on args, preferring config values"""
+        for f, v in args.__iter_fields__():
+            if isinstance(v, ARGDefault):
+                if f in _CONFIG_FIELDS and (nv := getattr(self, f)) is not UNSET:
+                    setattr(args, f, nv)
+                else:
+                    setattr(args, f, v.value)
+
+
+_CONFIG_FIELDS = frozenset(Config.__struct_fields__)
@@ -9,13 +9,12 @@ from .utils import wrap_async
 class InputFile(ABC):
     _fpath: Path
     _write_lock: Lock
-    content: dict[int, tuple[Lock, str]]
+    content: list[str]
 
     def __init__(self, fp: str):
         self._fpath = Path(fp)
-        self.content = {}
-        with open(self._fpath, "r", encoding="utf-8") as f:
-            self.content = {n: (Lock(), line.strip()) for n, line in enumerate(f, 1)}
+        lines = self._fpath.read_text(encoding="utf-8").splitlines()
+        self.content = [line.strip() for line in lines]
         self._write_lock = Lock()
 
     def __repr__(self):
@@ -25,8 +24,8 @@ class InputFile(ABC):
         return self.content.__len__()
 
     async def __aiter__(self):
-        for x in sorted(self.content):
-            yield x, await self.get(x)
+        for n, line in enumerate(self.content, 1):
+            yield n, line
 
     @asynccontextmanager
     async def ensure_write(self):
@@ -35,25 +34,19 @@ class InputFile(ABC):
         finally:
             await self.write()
 
-    async def set(self, k: int, v: str):
-        try:
-            lock = self.content[k][0]
-        except KeyError:
-            lock = Lock()
-        async with lock:
-            self.content[k] = (lock, v)
+    def set(self, k: int, v: str):
+        self.content[k - 1] = v
 
-    async def get(self, k: int):
-        async with self.content[k][0]:
-            return self.content[k][1]
+    def get(self, k: int):
+        return self.content[k - 1]
 
     async def set_status(self, at: int, fmt: str):
-        await self.set(at, fmt % await self.get(at))
+        self.set(at, fmt % self.get(at))
 
     async def write(self):
         async with self._write_lock:
             await wrap_async(
                 self._fpath.write_text,
-                "".join(["%s\n" % await self.get(n) for n in sorted(self.content)]),
+                "".join(["%s\n" % line for line in self.content]),
                 encoding="utf-8",
             )
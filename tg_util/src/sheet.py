@@ -1,9 +1,9 @@
 import logging
 import subprocess
 from concurrent.futures import ThreadPoolExecutor
-from concurrent.futures import wait as wait_futures
+from os import cpu_count
 from pathlib import Path
-from threading import Event, Lock, Thread
+from threading import Event
 
 from .types import ABC
 
@@ -19,13 +19,8 @@ logger = logging.getLogger(__name__)
 
 class SheetGenerator(ABC):
     _closed: Event
-    _finalizing: Event
-    _running: Event
     _stopped: Event
-    lock: Lock
     pool: ThreadPoolExecutor
-    queue: list[Path]
-    thread: Thread
 
     @staticmethod
     def __ensure_open[T, **PT](func: "Callable[Concatenate[SheetGenerator, PT], T]"):
@@ -38,11 +33,8 @@ class SheetGenerator(ABC):
 
     def __init__(self):
         self._closed = Event()
-        self._finalizing = Event()
-        self._running = Event()
         self._stopped = Event()
-        self.lock = Lock()
-        self.queue = []
+        self.pool = ThreadPoolExecutor(cpu_count() or 4)
 
     def __enter__(self):
         return self
@@ -53,67 +45,22 @@ class SheetGenerator(ABC):
     @__ensure_open
     def submit(self, val: Path):
         logger.debug("submitting %s for sheet generation", val.name)
-        with self.lock:
-            self.queue.append(val)
-        if not self._running.is_set():
-            logger.debug("thread is not started, starting thread")
-            self.thread = Thread(target=self._run, daemon=True)
-            self.thread.start()
+        self.pool.submit(generate_sheet, val)
 
     @__ensure_open
     def submits(self, vals: "Iterable[Path]"):
-        with self.lock:
-            self.queue.extend(vals)
-        if not self._running.is_set():
-            self.thread = Thread(target=self._run, daemon=True)
-            self.thread.start()
-
-    def get(self):
-        with self.lock:
-            return self.queue.pop(0)
+        for val in vals:
+            self.pool.submit(generate_sheet, val)
 
     @__ensure_open
     def close(self):
         self._closed.set()
         logger.debug("queue closed")
-        if self._running.is_set():
-            logger.debug("waiting thread")
-            self.thread.join()
-        if not self._stopped.is_set() and self.queue:
-            self._finalize()
-        self.queue.clear()
+        self.pool.shutdown(wait=not self._stopped.is_set())
 
     def stop(self):
         self._stopped.set()
-        if self._finalizing.is_set():
-            return self.pool.shutdown()
-
-    def _finalize(self):
-        try:
-            logger.debug("finalizing sheet generation")
-            self._finalizing.set()
-            with ThreadPoolExecutor(4) as self.pool:
-                wait_futures(self.pool.submit(generate_sheet, p) for p in self.queue)
-        finally:
-            self._finalizing.clear()
-
-    def _run(self):
-        try:
-            self._running.set()
-            logger.debug("running flag set")
-            logger.debug(
-                "is closed: %s, is stopped: %s",
-                self._closed.is_set(),
-                self._stopped.is_set(),
-            )
-            while not self._closed.is_set() and not self._stopped.is_set():
-                try:
-                    generate_sheet(self.get())
-                except IndexError:
-                    break
-        finally:
-            self._running.clear()
-            logger.debug("running flag cleared")
+        self.pool.shutdown(wait=False, cancel_futures=True)
 
 
 def generate_sheet(file: Path):
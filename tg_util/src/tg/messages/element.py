@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Any, Iterator, Self
 
 from tg_util.src.types import Decodable, TLSchemaBase
-from tg_util.src.utils import format_duration, round_size
+from tg_util.src.utils import clean_text, format_duration, round_size
 
 
 class PeerChat(TLSchemaBase):
@@ -140,15 +140,16 @@ class MessageElement(Decodable):
                         for s in sizes:
                             match s:
                                 case PhotoSizeProgressive(w, h, sizes):
+                                    largest = max(sizes)
                                     self._res_ = f"{w}x{h}"
-                                    self._size_ = str(sorted(sizes)[-1])
-                                    self._rounded_size_ = round_size(sorted(sizes)[-1])
+                                    self._size_ = str(largest)
+                                    self._rounded_size_ = round_size(largest)
 
     def link(self, resolve_peer_id: bool = False):
         return f"t.me/c/{self.peer_id.id}/{self.id}"
 
     def clean_text(self):
-        return " ".join([ss for s in self.message.splitlines() if (ss := s.strip())])
+        return clean_text(self.message)
 
     def __iter__(self) -> Iterator[str]:
         yield self.date.replace(tzinfo=None).isoformat(" ")
@@ -15,14 +15,31 @@ from telethon.tl.types import (
 from telethon.utils import get_peer_id
 
 from tg_util.src.tg.utils import parse_entity, parse_hashtags
-from tg_util.src.utils import format_duration, round_size
+from tg_util.src.utils import clean_text, format_duration, round_size
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
+    from typing import Any
+
     from telethon.tl.custom import Message
 
 logger = logging.getLogger(__name__)
 
+_ENTITY_CACHE: "dict[tuple[type, Any], tuple[str, str, str, int]]" = {}
+
+
+def _parse_entity_cached(entity: "Any"):
+    """chats and senders repeat for thousands of messages per export"""
+    key = (entity.__class__, getattr(entity, "id", None))
+    try:
+        return _ENTITY_CACHE[key]
+    except KeyError:
+        parsed = parse_entity(entity)
+        if len(_ENTITY_CACHE) >= 1024:
+            _ENTITY_CACHE.clear()
+        _ENTITY_CACHE[key] = parsed
+        return parsed
+
 
 class MessageExport(Struct, array_like=True):
     date: datetime
@@ -60,7 +77,9 @@ class MessageExport(Struct, array_like=True):
         sender_name = sender_username = sender_id = None
         if msg.sender is not None:
             try:
-                _, sender_name, sender_username, sender_id = parse_entity(msg.sender)
+                _, sender_name, sender_username, sender_id = _parse_entity_cached(
+                    msg.sender
+                )
             except TypeError:
                 logger.warning(
                     "unable to parse sender for entity %s: %r",
@@ -68,12 +87,10 @@ class MessageExport(Struct, array_like=True):
                     msg.sender,
                 )
 
-        _, chat_name, chat_username, _ = parse_entity(msg.chat)
-        clean_text = None
+        _, chat_name, chat_username, _ = _parse_entity_cached(msg.chat)
+        cleaned = None
         if msg.message is not None:
-            clean_text = " ".join(
-                [ss for s in msg.message.splitlines() if (ss := s.strip())]
-            )
+            cleaned = clean_text(msg.message)
 
         has_photo = False
         has_video = False
@@ -130,8 +147,8 @@ class MessageExport(Struct, array_like=True):
                                     resolution = f"{w}x{h}"
                                     width = w
                                     height = h
-                                    size = sorted(sizes)[-1]
-                                    human_readable_size = round_size(sorted(sizes)[-1])
+                                    size = max(sizes)
+                                    human_readable_size = round_size(size)
         reactions = None
         if msg.reactions:
             reactions = sum(x.count for x in msg.reactions.results)
@@ -143,7 +160,7 @@ class MessageExport(Struct, array_like=True):
             chat_username,
             msg.id,
             msg.message,
-            clean_text,
+            cleaned,
             has_photo,
             has_video,
             size,
@@ -1,8 +1,9 @@
 import logging
+import os
 from hashlib import blake2b
 from typing import TYPE_CHECKING, Any, cast
 
-from msgspec import Struct, json
+from msgspec import Struct, field, json
 from telethon.errors import FileReferenceExpiredError
 from telethon.utils import get_input_location
 
@@ -28,6 +29,23 @@ class InputMessageWrapper(Struct):
     overwrite: bool
     thumbs_only: bool
 
+    _dir_cache: "dict[Path, set[str]]" = field(default_factory=dict)
+
+    def target_exists(self, fp: "Path"):
+        try:
+            names = self._dir_cache[fp.parent]
+        except KeyError:
+            try:
+                entries = os.listdir(fp.parent)
+            except OSError:
+                entries = ()
+            names = self._dir_cache.setdefault(fp.parent, set(entries))
+        return fp.name in names
+
+    def track_target(self, fp: "Path"):
+        if (names := self._dir_cache.get(fp.parent)) is not None:
+            names.add(fp.name)
+
     async def wrap(
         self,
         message: "Message",
@@ -147,17 +165,22 @@ class InputMessageWrapper(Struct):
             await self.client.get_messages(message.input_chat, ids=message.id),
         )
 
-    async def write_meta(self, message: "Message", entity: "Entity", fp: "Path"):
+    def encode_meta(self, message: "Message", entity: "Entity"):
         meta = message.to_dict()
         meta["_hashtags"] = parse_hashtags(message)
         meta["peer_id"]["_entity"] = entity.to_dict()
-        await wrap_async(fp.parent.mkdir, parents=True, exist_ok=True)
-        await wrap_async(
-            fp.write_bytes,
-            await wrap_async(
-                json.format, await wrap_async(json.encode, meta, enc_hook=str)
-            ),
-        )
+        return json.format(_META_ENC.encode(meta))
+
+    async def write_meta(self, message: "Message", entity: "Entity", fp: "Path"):
+        await wrap_async(_write_file, fp, self.encode_meta(message, entity))
+
+
+_META_ENC = json.Encoder(enc_hook=str)
+
+
+def _write_file(fp: "Path", payload: bytes):
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    fp.write_bytes(payload)
 
 
 class MessageWrapped(Struct):
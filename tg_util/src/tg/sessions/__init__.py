@@ -1,3 +1,3 @@
-__all__ = ("create",)
+__all__ = ("SessionURL", "create", "parse_session_url")
 
-from .factory import create
+from .factory import SessionURL, create, parse_session_url
@@ -1,6 +1,7 @@
 import os
 import sys
 from pathlib import Path
+from shutil import copyfile
 
 from telethon.sessions import SQLiteSession
 
@@ -22,11 +23,7 @@ class CustomSession(SQLiteSession):
         else:
             root = Path("/tmp")
         self.__temp_session = root / f"{name}_{os.getpid()}.session"
-        with (
-            open(self.__temp_session, "wb", 0) as fo,
-            open(self.__orig_session, "rb", 0) as fi,
-        ):
-            fo.writelines(fi)
+        copyfile(self.__orig_session, self.__temp_session)
         super().__init__(str(self.__temp_session))
         self._closed = False
 
@@ -42,11 +39,6 @@ class CustomSession(SQLiteSession):
     def close(self):
         if not self._closed:
             super().close()
-            self.__orig_session.write_bytes(self.__temp_session.read_bytes())
-            with (
-                open(self.__orig_session, "wb", 0) as fo,
-                open(self.__temp_session, "rb", 0) as fi,
-            ):
-                fo.writelines(fi)
+            copyfile(self.__temp_session, self.__orig_session)
             self.delete()
             self._closed = True
@@ -1,7 +1,34 @@
+from urllib.parse import ParseResult, parse_qs, urlparse
+
+from msgspec import Struct
+
 TYPE_CHECKING = False
 if TYPE_CHECKING:
     from typing import Any
-    from urllib.parse import ParseResult
+
+
+class SessionURL(Struct, frozen=True):
+    url: ParseResult
+    api_id: int
+    api_hash: str
+
+
+def parse_session_url(s: str):
+    match urlparse(s):
+        case (
+            ParseResult(
+                username=str(),
+                password=str(),
+                hostname=str(),
+                port=int(),
+                query=query,
+            ) as url
+        ):
+            qs = parse_qs(query)
+            return SessionURL(url, int(qs["api_id"][0], 10), qs["api_hash"][0])
+        case invalid:
+            err = f"invalid or incomplete session: {invalid}"
+            raise ValueError(err)
 
 
 def create(url: "ParseResult", ipv6: bool):
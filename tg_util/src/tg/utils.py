@@ -1,6 +1,9 @@
+from asyncio.locks import Lock
+from asyncio.tasks import gather
 from hashlib import blake2b
 
 from telethon.tl.functions.upload import GetFileHashesRequest
+from telethon.tl.tlobject import TLObject
 from telethon.tl.types import (
     Channel,
     ChannelForbidden,
@@ -38,7 +41,10 @@ if TYPE_CHECKING:
     from telethon.tl.custom.file import File
 
 
+_NO_HASHTAGS: list[str] = []
+
 ENTITIES: dict[str, "Entity"] = {}
+ENTITY_LOCKS: dict[str, Lock] = {}
 SENDERS: dict[int, "MTProtoSender"] = {}
 
 
@@ -49,20 +55,25 @@ async def resolve_entity(
 ):
     if isinstance(entity, str) and entity.isdigit():
         entity = int(entity, 10)
+    key = str(entity)
     try:
-        e: Entity = ENTITIES[str(entity)]
+        e: Entity = ENTITIES[key]
     except KeyError:
-        if isinstance(entity, int):
+        async with ENTITY_LOCKS.setdefault(key, Lock()):
             try:
-                e = await client.get_entity(PeerChannel(entity))  # type: ignore
-            except Exception:
-                try:
-                    e = await client.get_entity(PeerChat(entity))  # type: ignore
-                except Exception:
-                    e = await client.get_entity(PeerUser(entity))  # type: ignore
-        else:
-            e = await client.get_entity(entity)  # type: ignore
-        ENTITIES[str(entity)] = e  # type: ignore
+                e = ENTITIES[key]
+            except KeyError:
+                if isinstance(entity, int):
+                    try:
+                        e = await client.get_entity(PeerChannel(entity))  # type: ignore
+                    except Exception:
+                        try:
+                            e = await client.get_entity(PeerChat(entity))  # type: ignore
+                        except Exception:
+                            e = await client.get_entity(PeerUser(entity))  # type: ignore
+                else:
+                    e = await client.get_entity(entity)  # type: ignore
+                ENTITIES[key] = e  # type: ignore
     return (e, await get_entity_stats(client, e)) if with_stats else e
 
 
@@ -86,15 +97,24 @@ async def get_file_hash(
 
 
 def parse_hashtags(msg: "Message"):
-    if not msg.entities:
-        return []
-    s = set(
-        get_inner_text(
-            msg.message,
-            (e for e in msg.entities if isinstance(e, MessageEntityHashtag)),
-        )
-    )
-    return sorted(s, key=str.casefold)
+    if not msg.entities or not msg.message:
+        # shared singleton; callers only ever encode the result
+        return _NO_HASHTAGS
+    tags = [e for e in msg.entities if isinstance(e, MessageEntityHashtag)]
+    if not tags:
+        return _NO_HASHTAGS
+    return sorted(set(get_inner_text(msg.message, tags)), key=str.casefold)
+
+
+def tl_enc_hook(obj: "Any"):
+    """shallow to_dict substitute for encoding TLObjects with msgspec"""
+    if isinstance(obj, TLObject):
+        d: "dict[str, Any]" = {"_": obj.__class__.__name__}
+        for k, v in obj.__dict__.items():
+            if not k.startswith("_"):
+                d[k] = v
+        return d
+    return str(obj)
 
 
 def parse_entity(entity: "Any"):
@@ -159,25 +179,19 @@ def get_file_attr(file: "File"):
 
 async def get_entity_stats(client: "TelegramClient", entity: "Entity"):
     type, title, username, id = parse_entity(entity)
-    media_count = getattr(
-        await client.get_messages(entity, 0, filter=InputMessagesFilterPhotoVideo),
-        "total",
-        0,
-    )
-    file_count = getattr(
-        await client.get_messages(entity, 0, filter=InputMessagesFilterDocument),
-        "total",
-        0,
+    medias, files, messages = await gather(
+        client.get_messages(entity, 0, filter=InputMessagesFilterPhotoVideo),
+        client.get_messages(entity, 0, filter=InputMessagesFilterDocument),
+        client.get_messages(entity, 0),
     )
-    message_count = getattr(await client.get_messages(entity, 0), "total", -1)
     return EntityStats(
         type,
         title,
         username,
         id,
-        media_count,
-        file_count,
-        message_count,
+        getattr(medias, "total", 0),
+        getattr(files, "total", 0),
+        getattr(messages, "total", -1),
     )
 
 
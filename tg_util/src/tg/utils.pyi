@@ -1,3 +1,4 @@
+from asyncio.locks import Lock
 from collections.abc import AsyncIterator
 from typing import Any, Literal, overload
 
@@ -11,6 +12,7 @@ from telethon.tl.types import TypeInputFileLocation
 from tg_util.src.types import EntityStats, FileAttribute
 
 ENTITIES: dict[str, Entity]
+ENTITY_LOCKS: dict[str, Lock]
 SENDERS: dict[int, MTProtoSender]
 
 @overload
@@ -33,6 +35,7 @@ async def get_file_hash(
     """known raises: LocationInvalidError"""
 
 def parse_hashtags(message: Message) -> list[str]: ...
+def tl_enc_hook(obj: Any) -> dict[str, Any] | str: ...
 def parse_entity(entity: Any) -> tuple[str, str, str, int]:
     """return: class, title, username, id"""
 
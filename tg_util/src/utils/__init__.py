@@ -1,20 +1,25 @@
 __all__ = (
     "JSON_ENC",
+    "LazyStr",
     "add_misc_args",
     "add_opts_args",
+    "clean_text",
     "encode_json_str",
     "format_duration",
     "parse_proxy",
+    "prefetch",
     "round_size",
     "unpack_default",
     "wrap_async",
 )
 
-from .aiohelper import wrap_async
+from .aiohelper import prefetch, wrap_async
 from .helper import (
     JSON_ENC,
+    LazyStr,
     add_misc_args,
     add_opts_args,
+    clean_text,
     encode_json_str,
     format_duration,
     parse_proxy,
@@ -1,13 +1,15 @@
 from asyncio.coroutines import iscoroutinefunction
 from asyncio.events import AbstractEventLoop, get_running_loop
+from asyncio.queues import Queue
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import AsyncGenerator, AsyncIterable, Callable
 
 loop: AbstractEventLoop
+executor: ThreadPoolExecutor
 
 
 async def wrap_async[**P, T](
@@ -19,10 +21,42 @@ async def wrap_async[**P, T](
     if iscoroutinefunction(func) or not callable(func):
         err = f"{func} is either a coroutine or not callable"
         raise TypeError(err)
-    global loop
+    global loop, executor
     try:
         _ = loop
     except NameError:
         loop = get_running_loop()
-    with ThreadPoolExecutor(1) as e:
-        return await loop.run_in_executor(e, partial(func, *args, **kwargs))
+    try:
+        _ = executor
+    except NameError:
+        executor = ThreadPoolExecutor(thread_name_prefix="wrap_async")
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+async def prefetch[T](
+    source: "AsyncIterable[T]",
+    buffer: int = 4,
+) -> "AsyncGenerator[T]":
+    queue: "Queue[tuple[T | None, BaseException | None]]" = Queue(buffer)
+
+    async def produce():
+        try:
+            async for item in source:
+                await queue.put((item, None))
+        except BaseException as e:  # noqa: BLE001
+            await queue.put((None, e))
+        else:
+            await queue.put((None, StopAsyncIteration()))
+
+    task = get_running_loop().create_task(produce())
+    try:
+        while True:
+            match await queue.get():
+                case item, None:
+                    yield item  # type: ignore
+                case _, StopAsyncIteration():
+                    return
+                case _, exc:
+                    raise exc  # type: ignore
+    finally:
+        task.cancel()
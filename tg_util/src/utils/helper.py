@@ -1,5 +1,7 @@
+import re
 from argparse import BooleanOptionalAction
 from datetime import timedelta
+from functools import lru_cache
 
 from msgspec import json
 
@@ -9,12 +11,29 @@ from tg_util.src.types import ARGDefault
 TYPE_CHECKING = False
 if TYPE_CHECKING:
     from argparse import ArgumentParser
+    from collections.abc import Callable
     from typing import Any
     from urllib.parse import ParseResult
 
 JSON_ENC = json.Encoder()
 
+# any str.splitlines separator with its surrounding whitespace
+_LINE_RE = re.compile(r"\s*[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]\s*")
 
+
+class LazyStr:
+    """defer building a log argument until it is actually formatted"""
+
+    __slots__ = ("_func",)
+
+    def __init__(self, func: "Callable[[], str]"):
+        self._func = func
+
+    def __str__(self):
+        return self._func()
+
+
+@lru_cache(maxsize=4096)
 def round_size(n: float | int) -> str:
     for unit in ("Bytes", "KB", "MB"):
         if n < 1024.0:
@@ -26,6 +45,12 @@ def round_size(n: float | int) -> str:
     return f"{n:.1f} GB"
 
 
+def clean_text(text: str):
+    """collapse line breaks and the whitespace around them into spaces"""
+    return _LINE_RE.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=4096)
 def format_duration(secs: float) -> str:
     return str(timedelta(seconds=secs))
 